@@ -0,0 +1,123 @@
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import math
+import random
+
+class ASHA(object):
+    """Asynchronous successive halving scheduler.
+
+    Trials report a loss (lower is better) for each step. When a trial
+    reaches a rung, its loss is recorded and compared to the losses
+    that other trials recorded at that rung. Trials outside the top
+    `1 / reduction_factor` are stopped. Trials are never waited on, so
+    the scheduler works for trials run in any order or concurrently.
+    """
+
+    def __init__(self, max_steps, min_steps=1, reduction_factor=3):
+        self.max_steps = max_steps
+        self.reduction_factor = reduction_factor
+        self.rungs = _rungs(min_steps, max_steps, reduction_factor)
+        self._rung_losses = {rung: [] for rung in self.rungs}
+
+    def report(self, step, loss):
+        """Returns True if a trial should continue past step."""
+        if step >= self.max_steps:
+            return False
+        losses = self._rung_losses.get(step)
+        if losses is None:
+            return True
+        losses.append(loss)
+        return loss <= _percentile(losses, 100 / self.reduction_factor)
+
+def _rungs(min_steps, max_steps, reduction_factor):
+    rungs = []
+    step = min_steps
+    while step < max_steps:
+        rungs.append(step)
+        step *= reduction_factor
+    return rungs
+
+def _percentile(vals, p):
+    vals = sorted(vals)
+    pos = (len(vals) - 1) * p / 100
+    lo = int(math.floor(pos))
+    hi = min(lo + 1, len(vals) - 1)
+    return vals[lo] + (vals[hi] - vals[lo]) * (pos - lo)
+
+###################################################################
+# Noisy objective
+###################################################################
+
+def noisy(x):
+    return math.sin(5 * x) * (1 - math.tanh(x ** 2))
+
+def objective(x, step):
+    """Noiseless loss at step for a trial converging on `noisy(x)`."""
+    return noisy(x) + 1.0 / step
+
+def noisy_loss(x, noise, step):
+    return objective(x, step) + random.gauss(0, noise)
+
+def run_trial(scheduler, x, noise):
+    """Runs a noisy trial under scheduler.
+
+    Returns a tuple of step losses as `(step, loss)` and a flag
+    indicating whether or not the trial was stopped early.
+    """
+    losses = []
+    for step in range(1, scheduler.max_steps + 1):
+        loss = noisy_loss(x, noise, step)
+        losses.append((step, loss))
+        if not scheduler.report(step, loss):
+            return losses, step < scheduler.max_steps
+    return losses, False
+
+###################################################################
+# Benchmark
+###################################################################
+
+def main():
+    args = _init_args()
+    grid = _x_grid(args.trials)
+    random.seed(args.seed)
+    random.shuffle(grid)
+    full = _run_grid(grid, args, None)
+    asha = _run_grid(grid, args, ASHA(
+        args.max_steps, reduction_factor=args.reduction_factor))
+    full_steps, full_best = full
+    asha_steps, asha_best = asha
+    print("Trials:     %i (max %i steps)" % (args.trials, args.max_steps))
+    print("Full grid:  %i steps, best objective %f" % (full_steps, full_best))
+    print("ASHA:       %i steps, best objective %f" % (asha_steps, asha_best))
+    print("Saved:      %.1f%%" % (100 * (1 - asha_steps / full_steps)))
+
+def _init_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("--trials", type=int, default=81)
+    p.add_argument("--max-steps", type=int, default=27)
+    p.add_argument("--reduction-factor", type=int, default=3)
+    p.add_argument("--noise", type=float, default=0.1)
+    p.add_argument("--seed", type=int, default=0)
+    return p.parse_args()
+
+def _x_grid(n):
+    return [-2.0 + 4.0 * i / (n - 1) for i in range(n)]
+
+def _run_grid(grid, args, scheduler):
+    random.seed(args.seed)
+    scheduler = scheduler or ASHA(args.max_steps, min_steps=args.max_steps)
+    steps = 0
+    best = float("inf")
+    for x in grid:
+        losses, stopped = run_trial(scheduler, x, args.noise)
+        steps += len(losses)
+        if not stopped:
+            # Compare trials by their noiseless objective - final
+            # noisy losses are single draws that differ between grids
+            best = min(best, objective(x, args.max_steps))
+    return steps, best
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import logging
+import os
+import struct
+
+from hparams_wire import masked_crc32c
+
+log = logging.getLogger("eventfiles")
+
+# TFRecord header: uint64 length + uint32 masked crc of length
+_RECORD_HEADER = struct.Struct("<QI")
+_RECORD_LEN_SIZE = 8
+_RECORD_FOOTER_SIZE = 4
+
+def is_event_file(name):
+    return "tfevents" in name
+
+class EventFileTail(object):
+    """Reads records appended to an event file since the last read.
+
+    Incomplete records at the end of the file are kept until the rest
+    of the record is written.
+
+    Record lengths are checked against their CRC. TFRecords can't be
+    resynced after a bad length, so the file is marked `corrupt` and
+    isn't read again unless it's truncated or replaced.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.corrupt = False
+        self._pending = b""
+
+    def read_records(self):
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                if size < self.offset:
+                    # Truncated or replaced - start over
+                    self.offset = 0
+                    self.corrupt = False
+                    self._pending = b""
+                if self.corrupt:
+                    self.offset = size
+                if size == self.offset:
+                    return []
+                f.seek(self.offset)
+                data = f.read(size - self.offset)
+        except (IOError, OSError):
+            return []
+        self.offset += len(data)
+        return self._split_records(self._pending + data)
+
+    def _split_records(self, data):
+        records = []
+        pos = 0
+        while len(data) - pos >= _RECORD_HEADER.size:
+            length, crc = _RECORD_HEADER.unpack_from(data, pos)
+            if crc != masked_crc32c(data[pos:pos + _RECORD_LEN_SIZE]):
+                log.warning(
+                    "Corrupt record length in %s at offset %i - "
+                    "ignoring the rest of the file", self.path,
+                    self.offset - len(data) + pos)
+                self.corrupt = True
+                self._pending = b""
+                return records
+            start = pos + _RECORD_HEADER.size
+            end = start + length
+            if end + _RECORD_FOOTER_SIZE > len(data):
+                break
+            records.append(data[start:end])
+            pos = end + _RECORD_FOOTER_SIZE
+        self._pending = data[pos:]
+        return records
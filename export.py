@@ -0,0 +1,362 @@
+from __future__ import print_function
+
+import argparse
+import importlib
+import os
+import sys
+
+from collections import namedtuple
+
+import numpy as np
+
+from tensorboard.backend.event_processing.event_file_loader import \
+    EventFileLoader
+from tensorboard.compat.proto import summary_pb2
+from tensorboard.plugins.hparams import api_pb2
+from tensorboard.plugins.hparams import metadata
+from tensorboard.util import tensor_util
+
+from eventfiles import is_event_file
+
+RUN_COL = "run"
+HPARAM_PREFIX = "hparam/"
+METRIC_PREFIX = "metric/"
+
+METRIC_AGGS = ("last", "step", "min", "max", "count")
+
+FINISHED_STATUS = (api_pb2.STATUS_SUCCESS, api_pb2.STATUS_FAILURE)
+
+SessionRow = namedtuple(
+    "SessionRow", [
+        "run", "group", "start_time", "end_time", "status",
+        "hparams", "metrics", "events"])
+
+MetricAgg = namedtuple(
+    "MetricAgg", ["last", "step", "min", "max", "count"])
+
+EventsStat = namedtuple("EventsStat", ["size", "mtime"])
+
+def main():
+    args = _init_args()
+    read, write = _output_format(args.output)
+    existing = {} if args.full else _read_existing(args.output, read)
+    rows = read_sessions(args.logdir, known_runs=_known_runs(existing))
+    if not rows and existing:
+        print("No new or updated runs in %s" % args.logdir)
+        return
+    updated = _drop_rows(existing, set(row.run for row in rows))
+    cols = merge_columns(updated, session_columns(rows))
+    write(args.output, cols)
+    print(
+        "Wrote %i session(s) (%i new or updated) to %s"
+        % (len(cols.get(RUN_COL, ())), len(rows), args.output))
+
+def _known_runs(cols):
+    """Returns a dict of runs in cols to the event files stat read.
+
+    Runs that ended in success or failure map to None - they aren't
+    read again. Other runs may still be in flight or may never log a
+    session end, and are read again only when their event files
+    change.
+    """
+    if not cols:
+        return {}
+    known = {}
+    sizes = cols.get("events_size")
+    mtimes = cols.get("events_mtime")
+    for i, (run, status) in enumerate(zip(cols[RUN_COL], cols["status"])):
+        if status in FINISHED_STATUS:
+            known[run] = None
+        elif sizes is not None and mtimes is not None:
+            known[run] = EventsStat(int(sizes[i]), float(mtimes[i]))
+    return known
+
+def _drop_rows(cols, runs):
+    if not cols or not runs:
+        return cols
+    keep = ~np.isin(cols[RUN_COL], list(runs))
+    return {name: col[keep] for name, col in cols.items()}
+
+def _init_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("logdir")
+    p.add_argument(
+        "output",
+        help="output file (.npz or .parquet - parquet requires pyarrow)")
+    p.add_argument(
+        "--full", action="store_true",
+        help=(
+            "rewrite output from all runs rather than append new and "
+            "unfinished runs"))
+    return p.parse_args()
+
+###################################################################
+# Read sessions
+###################################################################
+
+def read_sessions(logdir, known_runs=None):
+    """Returns session rows for runs in logdir.
+
+    `known_runs` is a dict of runs to skip, mapped to the `EventsStat`
+    they were read at (see `_known_runs`). A run mapped to None is
+    always skipped.
+    """
+    known_runs = known_runs or {}
+    rows = []
+    for run, paths in iter_runs(logdir):
+        stat = events_stat(paths)
+        if run in known_runs and known_runs[run] in (None, stat):
+            continue
+        row = read_session(run, paths, stat)
+        if row:
+            rows.append(row)
+    return rows
+
+def iter_runs(logdir):
+    for root, dirs, files in os.walk(logdir):
+        dirs.sort()
+        events = sorted([name for name in files if is_event_file(name)])
+        if events:
+            run = os.path.relpath(root, logdir)
+            yield (
+                "" if run == "." else run,
+                [os.path.join(root, name) for name in events])
+
+def events_stat(event_paths):
+    size = 0
+    mtime = 0.0
+    for path in event_paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        size += st.st_size
+        mtime = max(mtime, st.st_mtime)
+    return EventsStat(size, mtime)
+
+def read_session(run, event_paths, events=None):
+    """Returns a session row for a run's event files.
+
+    `events` is the `EventsStat` for event_paths, taken before they're
+    read. If not specified, it's read here.
+    """
+    if events is None:
+        events = events_stat(event_paths)
+    start_info = None
+    end_info = None
+    scalar_tags = set()
+    scalars = {}
+    for path in event_paths:
+        for event in EventFileLoader(path).Load():
+            for val in event.summary.value:
+                if val.tag == metadata.SESSION_START_INFO_TAG:
+                    start_info = _plugin_data(
+                        val, metadata.parse_session_start_info_plugin_data)
+                elif val.tag == metadata.SESSION_END_INFO_TAG:
+                    end_info = _plugin_data(
+                        val, metadata.parse_session_end_info_plugin_data)
+                elif _is_scalar(val, scalar_tags):
+                    scalar_tags.add(val.tag)
+                    scalars.setdefault(val.tag, []).append(
+                        (event.step, _scalar_value(val)))
+    if start_info is None:
+        return None
+    return SessionRow(
+        run=run,
+        group=start_info.group_name,
+        start_time=start_info.start_time_secs or np.nan,
+        # Protobuf reads an unset end time as 0
+        end_time=(end_info.end_time_secs or np.nan) if end_info else np.nan,
+        status=end_info.status if end_info else api_pb2.STATUS_UNKNOWN,
+        hparams=_hparam_values(start_info),
+        metrics={tag: _metric_agg(vals) for tag, vals in scalars.items()},
+        events=events)
+
+def _plugin_data(val, parse):
+    return parse(val.metadata.plugin_data.content)
+
+def _is_scalar(val, scalar_tags):
+    if val.tag in scalar_tags:
+        return True
+    return (
+        val.metadata.data_class == summary_pb2.DATA_CLASS_SCALAR
+        and val.metadata.plugin_data.plugin_name != metadata.PLUGIN_NAME)
+
+def _scalar_value(val):
+    return float(tensor_util.make_ndarray(val.tensor).item())
+
+def _hparam_values(start_info):
+    vals = {}
+    for name, val in start_info.hparams.items():
+        kind = val.WhichOneof("kind")
+        if kind == "number_value":
+            vals[name] = val.number_value
+        elif kind == "string_value":
+            vals[name] = val.string_value
+        elif kind == "bool_value":
+            vals[name] = val.bool_value
+    return vals
+
+def _metric_agg(step_vals):
+    step_vals.sort(key=lambda x: x[0])
+    vals = [val for _step, val in step_vals]
+    last_step, last = step_vals[-1]
+    return MetricAgg(last, last_step, min(vals), max(vals), len(vals))
+
+###################################################################
+# Columns
+###################################################################
+
+def session_columns(rows):
+    cols = {
+        RUN_COL: np.array([row.run for row in rows], dtype=np.str_),
+        "group": np.array([row.group for row in rows], dtype=np.str_),
+        "start_time": np.array(
+            [row.start_time for row in rows], dtype=np.float64),
+        "end_time": np.array(
+            [row.end_time for row in rows], dtype=np.float64),
+        "status": np.array([row.status for row in rows], dtype=np.int8),
+        "events_size": np.array(
+            [row.events.size for row in rows], dtype=np.int64),
+        "events_mtime": np.array(
+            [row.events.mtime for row in rows], dtype=np.float64),
+    }
+    for name in _all_keys(row.hparams for row in rows):
+        cols[HPARAM_PREFIX + name] = _hparam_column(
+            [row.hparams.get(name) for row in rows])
+    for tag in _all_keys(row.metrics for row in rows):
+        aggs = [row.metrics.get(tag) for row in rows]
+        for i, agg_name in enumerate(METRIC_AGGS):
+            cols[_metric_col(tag, agg_name)] = _metric_column(
+                [agg[i] if agg else None for agg in aggs], agg_name)
+    return cols
+
+def _all_keys(dicts):
+    keys = set()
+    for d in dicts:
+        keys.update(d)
+    return sorted(keys)
+
+def _hparam_column(vals):
+    if all(val is None or isinstance(val, bool) for val in vals):
+        return np.array(
+            [-1 if val is None else int(val) for val in vals], dtype=np.int8)
+    if all(val is None or _is_number(val) for val in vals):
+        return np.array(
+            [np.nan if val is None else val for val in vals],
+            dtype=np.float64)
+    return np.array(
+        ["" if val is None else str(val) for val in vals], dtype=np.str_)
+
+def _is_number(val):
+    return isinstance(val, (int, float)) and not isinstance(val, bool)
+
+def _metric_col(tag, agg_name):
+    if agg_name == "last":
+        return METRIC_PREFIX + tag
+    return "%s%s/%s" % (METRIC_PREFIX, tag, agg_name)
+
+def _metric_column(vals, agg_name):
+    if agg_name in ("step", "count"):
+        return np.array(
+            [-1 if val is None else val for val in vals], dtype=np.int64)
+    return np.array(
+        [np.nan if val is None else val for val in vals], dtype=np.float64)
+
+def merge_columns(a, b):
+    """Appends columns `b` to columns `a`.
+
+    Columns missing from either side are filled with a missing value
+    for the column type (NaN, -1 or ""). Columns whose types differ are
+    merged as strings.
+    """
+    a_len = _cols_len(a)
+    b_len = _cols_len(b)
+    merged = {}
+    for name in sorted(set(a) | set(b)):
+        a_col = a.get(name)
+        b_col = b.get(name)
+        if a_col is None:
+            a_col = _missing_column(b_col.dtype, a_len)
+        if b_col is None:
+            b_col = _missing_column(a_col.dtype, b_len)
+        merged[name] = _concat(a_col, b_col)
+    return merged
+
+def _cols_len(cols):
+    for col in cols.values():
+        return len(col)
+    return 0
+
+def _missing_column(dtype, n):
+    if dtype.kind == "f":
+        return np.full(n, np.nan, dtype=dtype)
+    if dtype.kind in ("i", "u"):
+        return np.full(n, -1, dtype=dtype)
+    return np.full(n, "", dtype=np.str_)
+
+def _concat(a, b):
+    if a.dtype.kind == b.dtype.kind:
+        return np.concatenate([a, b])
+    return np.concatenate([a.astype(np.str_), b.astype(np.str_)])
+
+###################################################################
+# Output formats
+###################################################################
+
+def _output_format(path):
+    ext = os.path.splitext(path)[1]
+    if ext == ".npz":
+        return _read_npz, _write_npz
+    elif ext == ".parquet":
+        _check_pyarrow()
+        return _read_parquet, _write_parquet
+    raise SystemExit(
+        "%s: unsupported output format '%s' (use .npz or .parquet)"
+        % (sys.argv[0], ext))
+
+def _read_existing(path, read):
+    if not os.path.exists(path):
+        return {}
+    return read(path)
+
+def _read_npz(path):
+    with np.load(path) as f:
+        return {name: f[name] for name in f.files}
+
+def _write_npz(path, cols):
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **cols)
+    os.rename(tmp, path)
+
+def _check_pyarrow():
+    try:
+        importlib.import_module("pyarrow.parquet")
+    except ImportError:
+        raise SystemExit(
+            "%s: writing .parquet requires pyarrow - use .npz or install "
+            "pyarrow" % sys.argv[0])
+
+def _read_parquet(path):
+    import pyarrow.parquet as pq
+    table = pq.read_table(path)
+    return {
+        name: _np_col(table.column(name).to_numpy())
+        for name in table.column_names
+    }
+
+def _np_col(arr):
+    if arr.dtype == object:
+        return arr.astype(np.str_)
+    return arr
+
+def _write_parquet(path, cols):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    table = pa.table({name: pa.array(col) for name, col in cols.items()})
+    tmp = path + ".tmp"
+    pq.write_table(table, tmp)
+    os.rename(tmp, path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+from __future__ import division
+from __future__ import print_function
+
+import itertools
+import math
+import numbers
+import os
+import socket
+import struct
+import time
+
+import six
+
+try:
+    from crc32c import crc32c as _crc32c
+except ImportError:
+    _crc32c = None
+
+PLUGIN_NAME = b"hparams"
+
+SESSION_START_INFO_TAG = b"_hparams_/session_start_info"
+SESSION_END_INFO_TAG = b"_hparams_/session_end_info"
+
+FILE_VERSION = b"brain.Event:2"
+
+# Serialized TensorProto for an empty float vector - the value that
+# tensorboard.plugins.hparams.metadata.NULL_TENSOR encodes to.
+NULL_TENSOR = b"\x08\x01\x12\x02\x12\x00"
+
+# Wire types
+_VARINT = 0
+_FIXED64 = 1
+_LEN = 2
+
+_DOUBLE = struct.Struct("<d")
+
+def _key(field, wire_type):
+    return bytes(bytearray([(field << 3) | wire_type]))
+
+# google.protobuf.Value
+_VALUE_NUMBER = _key(2, _FIXED64)
+_VALUE_STRING = _key(3, _LEN)
+_VALUE_BOOL = _key(4, _VARINT)
+
+# Map entry
+_ENTRY_KEY = _key(1, _LEN)
+_ENTRY_VALUE = _key(2, _LEN)
+
+# SessionStartInfo
+_START_HPARAMS = _key(1, _LEN)
+_START_MODEL_URI = _key(2, _LEN)
+_START_MONITOR_URL = _key(3, _LEN)
+_START_GROUP_NAME = _key(4, _LEN)
+_START_TIME_SECS = _key(5, _FIXED64)
+
+# SessionEndInfo
+_END_STATUS = _key(1, _VARINT)
+_END_TIME_SECS = _key(2, _FIXED64)
+
+# HParamsPluginData
+_DATA_VERSION = _key(1, _VARINT)
+_DATA_SESSION_START_INFO = _key(3, _LEN)
+_DATA_SESSION_END_INFO = _key(4, _LEN)
+
+# SummaryMetadata and SummaryMetadata.PluginData
+_METADATA_PLUGIN_DATA = _key(1, _LEN)
+_PLUGIN_DATA_NAME = _key(1, _LEN)
+_PLUGIN_DATA_CONTENT = _key(2, _LEN)
+
+# Summary and Summary.Value
+_SUMMARY_VALUE = _key(1, _LEN)
+_VALUE_TAG = _key(1, _LEN)
+_VALUE_TENSOR = _key(8, _LEN)
+_VALUE_METADATA = _key(9, _LEN)
+
+# Event
+_EVENT_WALL_TIME = _key(1, _FIXED64)
+_EVENT_STEP = _key(2, _VARINT)
+_EVENT_FILE_VERSION = _key(3, _LEN)
+_EVENT_SUMMARY = _key(5, _LEN)
+
+class SessionEncoder(object):
+    """Encodes hparams session summaries without protobuf.
+
+    Output is byte-identical to `SerializeToString(deterministic=True)`
+    for the equivalent `Summary` protos. Each encode method returns a
+    bytearray that is reused by the next call - copy it (e.g.
+    `bytes(buf)`) to keep it.
+
+    Use `null_tensor=True` to include the empty tensor value that the
+    `tensorboard.plugins.hparams` API adds to its summaries. The
+    default omits it, as the summaries created by `index.py` do.
+    """
+
+    def __init__(self, data_version=0, null_tensor=False):
+        self.data_version = data_version
+        self.null_tensor = null_tensor
+        self._buf = bytearray()
+        self._hparams = bytearray()
+        self._entry = bytearray()
+        self._info = bytearray()
+        self._content = bytearray()
+        self._event = bytearray()
+
+    def session_start_summary(self, group_name, hparams,
+                              start_time_secs=None, model_uri="",
+                              monitor_url=""):
+        info = _clear(self._info)
+        info += self._encode_hparams(hparams)
+        _write_str(info, _START_MODEL_URI, model_uri)
+        _write_str(info, _START_MONITOR_URL, monitor_url)
+        _write_str(info, _START_GROUP_NAME, group_name)
+        _write_double(info, _START_TIME_SECS, start_time_secs)
+        return self._summary(
+            SESSION_START_INFO_TAG, _DATA_SESSION_START_INFO, info)
+
+    def session_end_summary(self, status, end_time_secs=None):
+        info = _clear(self._info)
+        _write_varint_field(info, _END_STATUS, status)
+        _write_double(info, _END_TIME_SECS, end_time_secs)
+        return self._summary(
+            SESSION_END_INFO_TAG, _DATA_SESSION_END_INFO, info)
+
+    def event(self, summary, wall_time=None, step=0):
+        """Encodes an `Event` for an encoded summary.
+
+        `summary` must not be the buffer returned by the last call to
+        this method.
+        """
+        buf = _clear(self._event)
+        _write_double(buf, _EVENT_WALL_TIME, wall_time)
+        _write_varint_field(buf, _EVENT_STEP, step)
+        _write_len(buf, _EVENT_SUMMARY, summary)
+        return buf
+
+    def file_version_event(self, wall_time=None):
+        """Encodes the `Event` that starts an event file."""
+        buf = _clear(self._event)
+        _write_double(buf, _EVENT_WALL_TIME, wall_time)
+        _write_len(buf, _EVENT_FILE_VERSION, FILE_VERSION)
+        return buf
+
+    def _encode_hparams(self, hparams):
+        buf = _clear(self._hparams)
+        for name in sorted(hparams):
+            entry = _clear(self._entry)
+            # Map keys are written even when empty
+            _write_len(entry, _ENTRY_KEY, _utf8(name))
+            _write_hparam_value(entry, hparams[name])
+            _write_len(buf, _START_HPARAMS, entry)
+        return buf
+
+    def _summary(self, tag, data_field, info):
+        content = _clear(self._content)
+        _write_varint_field(content, _DATA_VERSION, self.data_version)
+        _write_len(content, data_field, info)
+        buf = _clear(self._buf)
+        value_len = (
+            _len_field_size(_VALUE_TAG, len(tag)) +
+            (_len_field_size(_VALUE_TENSOR, len(NULL_TENSOR))
+             if self.null_tensor else 0) +
+            _len_field_size(
+                _VALUE_METADATA, _metadata_size(len(content))))
+        buf += _SUMMARY_VALUE
+        _write_varint(buf, value_len)
+        _write_len(buf, _VALUE_TAG, tag)
+        if self.null_tensor:
+            _write_len(buf, _VALUE_TENSOR, NULL_TENSOR)
+        buf += _VALUE_METADATA
+        _write_varint(buf, _metadata_size(len(content)))
+        buf += _METADATA_PLUGIN_DATA
+        _write_varint(buf, _plugin_data_size(len(content)))
+        _write_len(buf, _PLUGIN_DATA_NAME, PLUGIN_NAME)
+        _write_len(buf, _PLUGIN_DATA_CONTENT, content)
+        return buf
+
+def _clear(buf):
+    del buf[:]
+    return buf
+
+def _write_hparam_value(entry, val):
+    if isinstance(val, bool):
+        entry += _ENTRY_VALUE
+        entry += b"\x02"
+        entry += _VALUE_BOOL
+        entry += b"\x01" if val else b"\x00"
+    elif isinstance(val, numbers.Real):
+        entry += _ENTRY_VALUE
+        entry += b"\x09"
+        entry += _VALUE_NUMBER
+        entry += _DOUBLE.pack(float(val))
+    elif isinstance(val, six.string_types):
+        encoded = _utf8(val)
+        value_len = _len_field_size(_VALUE_STRING, len(encoded))
+        entry += _ENTRY_VALUE
+        _write_varint(entry, value_len)
+        _write_len(entry, _VALUE_STRING, encoded)
+    else:
+        raise TypeError("unsupported hparam value %r" % (val,))
+
+def _write_str(buf, key, s):
+    if s:
+        _write_len(buf, key, _utf8(s))
+
+def _utf8(s):
+    if isinstance(s, six.text_type):
+        return s.encode("utf-8")
+    return s
+
+def _write_len(buf, key, data):
+    buf += key
+    _write_varint(buf, len(data))
+    buf += data
+
+def _write_double(buf, key, val):
+    if val is None:
+        return
+    if val == 0.0 and math.copysign(1.0, val) > 0:
+        return
+    buf += key
+    buf += _DOUBLE.pack(val)
+
+def _write_varint_field(buf, key, val):
+    if val:
+        buf += key
+        _write_varint(buf, val)
+
+def _write_varint(buf, val):
+    if val < 0:
+        val += 1 << 64
+    while val > 0x7f:
+        buf.append((val & 0x7f) | 0x80)
+        val >>= 7
+    buf.append(val)
+
+def _varint_size(val):
+    if val < 0:
+        return 10
+    size = 1
+    while val > 0x7f:
+        val >>= 7
+        size += 1
+    return size
+
+def _len_field_size(key, data_len):
+    return len(key) + _varint_size(data_len) + data_len
+
+def _plugin_data_size(content_len):
+    return (
+        _len_field_size(_PLUGIN_DATA_NAME, len(PLUGIN_NAME)) +
+        _len_field_size(_PLUGIN_DATA_CONTENT, content_len))
+
+def _metadata_size(content_len):
+    return _len_field_size(
+        _METADATA_PLUGIN_DATA, _plugin_data_size(content_len))
+
+###################################################################
+# Event files
+###################################################################
+
+class EventFileWriter(object):
+    """Writes encoded events to a new event file in logdir.
+
+    Events are framed as TFRecords - see `write_record`.
+    """
+
+    def __init__(self, logdir, filename_suffix=""):
+        self.path = os.path.join(logdir, _event_filename(filename_suffix))
+        self._f = open(self.path, "wb")
+        self._record = bytearray()
+        self.write_event(
+            SessionEncoder().file_version_event(time.time()))
+
+    def write_event(self, event):
+        write_record(self._f, event, self._record)
+
+    def flush(self):
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc):
+        self.close()
+
+# Writer IDs keep file names unique for writers created in the same
+# second (next() on a count is atomic in CPython)
+_writer_ids = itertools.count()
+
+def _event_filename(suffix):
+    return "events.out.tfevents.%010d.%s.%i.%i%s" % (
+        time.time(), socket.gethostname(), os.getpid(), next(_writer_ids),
+        suffix)
+
+_RECORD_LEN = struct.Struct("<Q")
+_RECORD_CRC = struct.Struct("<I")
+
+def write_record(f, data, buf=None):
+    """Writes data to file f as a TFRecord.
+
+    A record is the data length (uint64), masked CRC32C of the length,
+    data, and masked CRC32C of data. `buf`, if specified, is a
+    bytearray reused to assemble the record.
+    """
+    buf = _clear(buf) if buf is not None else bytearray()
+    header = _RECORD_LEN.pack(len(data))
+    buf += header
+    buf += _RECORD_CRC.pack(masked_crc32c(header))
+    buf += data
+    buf += _RECORD_CRC.pack(masked_crc32c(data))
+    f.write(buf)
+
+def masked_crc32c(data):
+    crc = _crc32c(bytes(data)) if _crc32c else _py_crc32c(data)
+    return (((crc >> 15) | (crc << 17)) + 0xa282ead8) & 0xffffffff
+
+def _crc32c_table():
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0x82f63b78 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+_CRC32C_TABLE = _crc32c_table()
+
+def _py_crc32c(data):
+    crc = 0xffffffff
+    table = _CRC32C_TABLE
+    for b in bytearray(data):
+        crc = table[(crc ^ b) & 0xff] ^ (crc >> 8)
+    return crc ^ 0xffffffff
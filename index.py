@@ -1,13 +1,21 @@
 from __future__ import print_function
 
 import argparse
+import hashlib
+import json
 import logging
 import os
 import random
+import shlex
+import socket
+import stat
 import sys
 import tempfile
+import threading
 import time
 
+from collections import namedtuple
+
 from tensorboardX import SummaryWriter
 
 from tensorboardX.proto.api_pb2 import Experiment
@@ -30,12 +38,15 @@ from tensorboardX.proto.types_pb2 import DT_STRING
 
 from tensorboardX.x2num import make_np
 
-from guild import guildfile
+import guild
+
 from guild import opref as opreflib
 from guild import run as runlib
 from guild import run_util
 from guild import util
 
+import asha
+
 logging.basicConfig(
     format="%(message)s",
     level=logging.INFO)
@@ -49,6 +60,15 @@ EXPERIMENT_TAG = "_hparams_/experiment"
 SESSION_START_INFO_TAG = '_hparams_/session_start_info'
 SESSION_END_INFO_TAG = '_hparams_/session_end_info'
 
+GUILDFILE_CACHE_VER = 1
+GUILDFILE_CACHE_DIR = (
+    os.getenv("HPARAMS_DEMO_CACHE_DIR") or
+    os.path.join(os.path.expanduser("~"), ".cache", "hparams-demo"))
+
+ASHA_TRIALS = 27
+ASHA_MAX_STEPS = 9
+ASHA_STOPPED_TAG = "stopped"
+
 SAMPLE_FLAGS = {
     "noise": 0.1,
     "x": 1.0,
@@ -83,9 +103,13 @@ class SampleRun(object):
 
 def main():
     args = _init_args()
+    mode = _mode_handler(args)
+    if mode:
+        mode(args)
+        return
     handler = _cmd_handler(args)
-    gf = guildfile.from_dir(".")
-    logdir = _init_logdir(args)
+    gf = load_guildfile(".")
+    logdir = _init_logdir(args.logdir)
     handler(gf, logdir)
     log.info("Wrote summaries to %s", logdir)
 
@@ -93,27 +117,163 @@ def _init_args():
     p = argparse.ArgumentParser()
     p.add_argument("cmd")
     p.add_argument("logdir", nargs='?')
+    p.add_argument(
+        "--requests", metavar="FILE",
+        help="batch requests file (default is stdin)")
+    p.add_argument(
+        "--socket", metavar="PATH",
+        help="Unix socket to serve requests on (default is stdin)")
     return p.parse_args()
 
+def _mode_handler(args):
+    for name, handler, _desc in MODES:
+        if args.cmd == name:
+            if args.logdir:
+                raise SystemExit(
+                    "{prog}: {cmd} does not take a logdir - use "
+                    "--requests FILE or --socket PATH"
+                    .format(prog=sys.argv[0], cmd=args.cmd))
+            return handler
+    return None
+
 def _cmd_handler(args):
     if args.cmd == "help":
         _print_help_and_exit()
-    for name, handler, _desc in CMDS:
-        if args.cmd == name:
-            return handler
+    handler = _lookup_cmd(args.cmd)
+    if handler:
+        return handler
     raise SystemExit(
         "{prog}: invalid cmd '{cmd}'\n"
         "Try 'python {prog} help' for a list of commands."
         .format(prog=sys.argv[0], cmd=args.cmd))
 
+def _lookup_cmd(cmd):
+    for name, handler, _desc in CMDS:
+        if cmd == name:
+            return handler
+    return None
+
 def _print_help_and_exit():
-    max_name = max([len(cmd[0]) for cmd in CMDS])
-    for name, _, desc in CMDS:
+    max_name = max([len(cmd[0]) for cmd in CMDS + MODES])
+    for name, _, desc in CMDS + MODES:
         print(name.ljust(max_name + 1), desc)
     raise SystemExit()
 
-def _init_logdir(args):
-    return args.logdir or tempfile.mkdtemp(prefix="guild-summaries-")
+def _init_logdir(logdir):
+    return logdir or tempfile.mkdtemp(prefix="guild-summaries-")
+
+###################################################################
+# Guildfile cache
+###################################################################
+
+class CachedGuildfile(object):
+
+    def __init__(self, src, data):
+        self.src = src
+        self.default_model = CachedModelDef(self, data["default_model"])
+
+class CachedModelDef(object):
+
+    def __init__(self, guildfile, data):
+        self.guildfile = guildfile
+        self.name = data["name"]
+        self._ops = {
+            op["name"]: CachedOpDef(self, op)
+            for op in data["operations"]
+        }
+
+    def get_operation(self, name):
+        return self._ops.get(name)
+
+class CachedOpDef(object):
+
+    def __init__(self, modeldef, data):
+        self.guildfile = modeldef.guildfile
+        self.modeldef = modeldef
+        self.name = data["name"]
+        self.flags = [CachedFlagDef(**flag) for flag in data["flags"]]
+
+CachedFlagDef = namedtuple(
+    "CachedFlagDef", ["name", "description", "type", "default", "min", "max"])
+
+def load_guildfile(dir):
+    src = os.path.abspath(os.path.join(dir, "guild.yml"))
+    key = _guildfile_cache_key(src)
+    cache_path = _guildfile_cache_path(src)
+    data = _read_guildfile_cache(cache_path, key)
+    if data is None:
+        log.debug("Resolving %s (cache miss)", src)
+        data = _resolve_guildfile_data(src)
+        _write_guildfile_cache(cache_path, key, data)
+    return CachedGuildfile(src, data)
+
+def _guildfile_cache_key(src):
+    try:
+        st = os.stat(src)
+        with open(src, "rb") as f:
+            sha256 = hashlib.sha256(f.read()).hexdigest()
+    except (IOError, OSError) as e:
+        raise SystemExit("cannot read %s: %s" % (src, e))
+    return {
+        "ver": GUILDFILE_CACHE_VER,
+        # Cached data is resolved by Guild, which may change on upgrade
+        "guild": guild.__version__,
+        "path": src,
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        "sha256": sha256,
+    }
+
+def _guildfile_cache_path(src):
+    name = hashlib.sha1(src.encode("utf-8")).hexdigest()
+    return os.path.join(GUILDFILE_CACHE_DIR, "guildfile-%s.json" % name)
+
+def _read_guildfile_cache(cache_path, key):
+    try:
+        with open(cache_path) as f:
+            cached = json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+    if cached.get("key") != key:
+        return None
+    return cached.get("data")
+
+def _write_guildfile_cache(cache_path, key, data):
+    tmp = "%s.%i.tmp" % (cache_path, os.getpid())
+    try:
+        util.ensure_dir(os.path.dirname(cache_path))
+        with open(tmp, "w") as f:
+            json.dump({"key": key, "data": data}, f)
+        os.rename(tmp, cache_path)
+    except (IOError, OSError) as e:
+        log.debug("Error writing guildfile cache %s: %s", cache_path, e)
+
+def _resolve_guildfile_data(src):
+    from guild import guildfile
+    gf = guildfile.from_dir(os.path.dirname(src))
+    model = gf.default_model
+    return {
+        "default_model": {
+            "name": model.name,
+            "operations": [_opdef_data(opdef) for opdef in model.operations],
+        }
+    }
+
+def _opdef_data(opdef):
+    return {
+        "name": opdef.name,
+        "flags": [_flagdef_data(flag) for flag in opdef.flags],
+    }
+
+def _flagdef_data(flag):
+    return {
+        "name": flag.name,
+        "description": flag.description,
+        "type": flag.type,
+        "default": flag.default,
+        "min": flag.min,
+        "max": flag.max,
+    }
 
 ###################################################################
 # Commands
@@ -261,6 +421,20 @@ def _runs(gf, logdir):
     for run in runs:
         _add_run_default(run, opdef, logdir)
 
+def _runs_asha(gf, logdir):
+    log.info("Running runs with ASHA early stopping scenario")
+    opdef = OpDef(gf, "noisy")
+    scheduler = asha.ASHA(ASHA_MAX_STEPS)
+    for _ in range(ASHA_TRIALS):
+        run = SampleRun(opdef, random_noisy_flags())
+        run.start()
+        scalars, stopped = asha_run_scalars(run, scheduler)
+        # HParams has no status for early stopped sessions - these are
+        # logged as successful and flagged by the ASHA_STOPPED_TAG
+        # scalar.
+        run.stop("terminated" if stopped else "completed")
+        _add_run_default(run, opdef, logdir, scalars)
+
 def _add_run_default(run, opdef, logdir, scalars=None):
     log.info(" - Adding run %s", run.short_id)
     run_logdir = os.path.join(logdir, run_label(run))
@@ -321,6 +495,8 @@ CMDS = [
      "add metrics after adding experiment (fails)"),
     ("runs",                     _runs,
      "generate multiple runs"),
+    ("runs-asha",                _runs_asha,
+     "generate runs stopped early by ASHA"),
     ("add-run",                  _add_run,
      "add run to logdir"),
     ("latent-metrics-2",         _latent_metrics_2,
@@ -329,6 +505,133 @@ CMDS = [
      "add metrics by adding multiple experiments"),
 ]
 
+###################################################################
+# Batch and serve modes
+###################################################################
+
+# Scenarios that read from stdin can't be run as requests.
+INTERACTIVE_CMDS = (
+    "status-change-replace",
+    "check-status",
+    "latent-metrics-2",
+)
+
+def _batch(args):
+    gf = load_guildfile(".")
+    f = _open_requests(args.requests)
+    errors = 0
+    try:
+        for line in f:
+            resp = _handle_request(line, gf)
+            if resp:
+                print(resp)
+                if resp.startswith("error "):
+                    errors += 1
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    if errors:
+        raise SystemExit(1)
+
+def _open_requests(path):
+    if not path or path == "-":
+        return sys.stdin
+    try:
+        return open(path)
+    except IOError as e:
+        raise SystemExit("cannot read %s: %s" % (path, e))
+
+def _serve(args):
+    gf = load_guildfile(".")
+    if args.socket:
+        _serve_socket(args.socket, gf)
+    else:
+        _serve_stream(sys.stdin, sys.stdout, gf)
+
+def _serve_stream(inp, out, gf):
+    while True:
+        line = inp.readline()
+        if not line:
+            break
+        resp = _handle_request(line, gf)
+        if resp:
+            out.write(resp + "\n")
+            out.flush()
+
+def _serve_socket(path, gf):
+    _remove_stale_socket(path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(path)
+    sock.listen(5)
+    log.info("Serving requests on %s", path)
+    try:
+        while True:
+            conn, _ = sock.accept()
+            # Handle each client in a thread so that an idle connection
+            # doesn't block other clients.
+            t = threading.Thread(target=_serve_conn, args=(conn, gf))
+            t.daemon = True
+            t.start()
+    finally:
+        sock.close()
+        os.remove(path)
+
+def _serve_conn(conn, gf):
+    try:
+        f = conn.makefile("rw")
+        try:
+            _serve_stream(f, f, gf)
+        finally:
+            f.close()
+    except (IOError, OSError) as e:
+        log.warning("Client connection error: %s", e)
+    finally:
+        conn.close()
+
+def _remove_stale_socket(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return
+    if not stat.S_ISSOCK(st.st_mode):
+        raise SystemExit("%s exists and is not a socket" % path)
+    os.remove(path)
+
+def _handle_request(line, gf):
+    """Runs a single 'CMD [LOGDIR]' request line.
+
+    Returns a one line response - 'ok LOGDIR' or 'error MSG' - or None
+    if line is blank or a comment.
+    """
+    try:
+        parts = shlex.split(line, comments=True)
+    except ValueError as e:
+        return "error %s" % e
+    if not parts:
+        return None
+    if len(parts) > 2:
+        return "error expected 'CMD [LOGDIR]' but got %r" % line.strip()
+    cmd = parts[0]
+    handler = _lookup_cmd(cmd)
+    if not handler:
+        return "error invalid cmd '%s'" % cmd
+    if cmd in INTERACTIVE_CMDS:
+        return "error cmd '%s' is interactive" % cmd
+    logdir = _init_logdir(parts[1] if len(parts) == 2 else None)
+    try:
+        handler(gf, logdir)
+    except (Exception, SystemExit) as e:
+        log.exception("%s %s", cmd, logdir)
+        return "error %s: %s" % (cmd, e)
+    return "ok %s" % logdir
+
+MODES = [
+    ("batch", _batch,
+     "run 'CMD [LOGDIR]' requests from --requests or stdin"),
+    ("serve", _serve,
+     "serve 'CMD [LOGDIR]' requests on --socket or stdin"),
+]
+
 ###################################################################
 # Scenario support
 ###################################################################
@@ -347,6 +650,14 @@ def run_scalars(_run):
         ("loss", -0.7, 4),
     ]
 
+def asha_run_scalars(run, scheduler):
+    flags = run.get("flags")
+    losses, stopped = asha.run_trial(scheduler, flags["x"], flags["noise"])
+    scalars = [("loss", loss, step) for step, loss in losses]
+    last_step = losses[-1][0]
+    scalars.append((ASHA_STOPPED_TAG, 1.0 if stopped else 0.0, last_step))
+    return scalars, stopped
+
 def random_noisy_flags():
     return {
         "noise": round(0.1 + (random.uniform(-0.1, 0.2)), 4),
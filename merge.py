@@ -0,0 +1,425 @@
+from __future__ import print_function
+
+import argparse
+import errno
+import fcntl
+import hashlib
+import os
+import shutil
+
+from collections import namedtuple
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+
+from tensorboard.backend.event_processing.event_file_loader import \
+    RawEventFileLoader
+from tensorboard.compat.proto import event_pb2
+from tensorboard.plugins.hparams import api_pb2
+from tensorboard.plugins.hparams import metadata
+from tensorboard.plugins.hparams import plugin_data_pb2
+from tensorboard.plugins.hparams import summary_v2 as hp
+from tensorboard.summary.writer.record_writer import RecordWriter
+
+from eventfiles import is_event_file
+from index2 import SummaryWriter
+
+# ioctl(2) request to clone a file's extents (Linux - btrfs, xfs, etc.)
+FICLONE = 0x40049409
+
+SHORT_ID_LEN = 8
+
+RunDir = namedtuple(
+    "RunDir", [
+        "worker", "run", "dir", "files", "experiment_files",
+        "session_files", "group_name", "hparams"])
+
+WorkerScan = namedtuple("WorkerScan", ["logdir", "runs", "experiments"])
+
+RunPlan = namedtuple("RunPlan", ["src", "dest", "group_name"])
+
+def main():
+    args = _init_args()
+    _check_output(args.output)
+    _check_workers(args.workers)
+    # Scanning parses every event in every worker logdir - use
+    # processes to parse in parallel.
+    scan_pool = Pool(min(args.jobs, len(args.workers)))
+    try:
+        scans = scan_pool.map(scan_worker, args.workers)
+    finally:
+        scan_pool.close()
+        scan_pool.join()
+    pool = ThreadPool(args.jobs)
+    try:
+        plans = plan_runs(scans)
+        experiment = merged_experiment(scans)
+        counts = {}
+        for methods in pool.imap_unordered(
+                lambda plan: merge_run(plan, args.output), plans):
+            for method in methods:
+                counts[method] = counts.get(method, 0) + 1
+    finally:
+        pool.close()
+        pool.join()
+    write_experiment(experiment, args.output)
+    renamed = sum(1 for plan in plans if plan.dest != plan.src.run)
+    print(
+        "Merged %i run(s) from %i worker(s) into %s (%i renamed)"
+        % (len(plans), len(scans), args.output, renamed))
+    print(
+        "Files: %s" % ", ".join(
+            "%i %s" % (n, method) for method, n in sorted(counts.items())))
+
+def _init_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("output", help="logdir to create for merged runs")
+    p.add_argument("workers", nargs="+", metavar="worker",
+                   help="worker logdir to merge")
+    p.add_argument(
+        "-j", "--jobs", type=int, default=8,
+        help="number of workers to scan and merge in parallel")
+    return p.parse_args()
+
+def _check_output(output):
+    if os.path.exists(output) and os.listdir(output):
+        raise SystemExit("%s exists and is not empty" % output)
+
+def _check_workers(workers):
+    for logdir in workers:
+        if not os.path.isdir(logdir):
+            raise SystemExit("%s is not a directory" % logdir)
+
+###################################################################
+# Scan workers
+###################################################################
+
+def scan_worker(logdir):
+    runs = []
+    experiments = []
+    for root, dirs, files in os.walk(logdir):
+        dirs.sort()
+        if not any(is_event_file(name) for name in files):
+            continue
+        run = _scan_run(logdir, root, sorted(files), experiments)
+        if run:
+            runs.append(run)
+    return WorkerScan(logdir, runs, experiments)
+
+def _scan_run(logdir, dir, files, experiments):
+    experiment_files = set()
+    session_files = set()
+    has_run_data = False
+    group_name = None
+    hparams = {}
+    for name in files:
+        if not is_event_file(name):
+            continue
+        for record in _read_records(os.path.join(dir, name)):
+            event = event_pb2.Event.FromString(record)
+            for val in event.summary.value:
+                if val.tag != metadata.EXPERIMENT_TAG:
+                    has_run_data = True
+                if val.tag == metadata.EXPERIMENT_TAG:
+                    experiments.append(metadata.parse_experiment_plugin_data(
+                        val.metadata.plugin_data.content))
+                    experiment_files.add(name)
+                elif val.tag == metadata.SESSION_START_INFO_TAG:
+                    info = metadata.parse_session_start_info_plugin_data(
+                        val.metadata.plugin_data.content)
+                    group_name = info.group_name
+                    hparams.update(info.hparams)
+                    session_files.add(name)
+    run = os.path.relpath(dir, logdir)
+    if run == ".":
+        if not has_run_data:
+            # Only experiment summaries, which are replaced by the
+            # merged experiment.
+            return None
+        # Output root holds the merged experiment - merge root run
+        # data as a run named for the worker.
+        run = os.path.basename(os.path.abspath(logdir))
+        print(
+            "Merging runs logged at root of %s as run '%s'"
+            % (logdir, run))
+    return RunDir(
+        worker=logdir,
+        run=run,
+        dir=dir,
+        files=files,
+        experiment_files=experiment_files,
+        session_files=session_files,
+        group_name=group_name,
+        hparams=hparams)
+
+def _read_records(path):
+    return RawEventFileLoader(path).Load()
+
+###################################################################
+# Plan runs
+###################################################################
+
+def plan_runs(scans):
+    """Returns a list of run plans with unique run names.
+
+    Runs are named '<short_id> <operation>' (see `index.run_label`). If
+    a run name is already used by an earlier worker, the run is given a
+    new short ID derived from its worker and name.
+    """
+    used = set()
+    plans = []
+    for scan in scans:
+        for run in scan.runs:
+            dest = run.run
+            if dest in used:
+                dest = _unique_run_name(run, used)
+            used.add(dest)
+            plans.append(RunPlan(run, dest, _group_name(run, dest)))
+    return plans
+
+def _unique_run_name(run, used):
+    parent, name = os.path.split(run.run)
+    parts = name.split(" ", 1)
+    seed = "%s\0%s" % (os.path.abspath(run.worker), run.run)
+    while True:
+        seed = hashlib.sha1(seed.encode("utf-8")).hexdigest()
+        parts[0] = seed[:SHORT_ID_LEN]
+        dest = os.path.join(parent, " ".join(parts))
+        if dest not in used:
+            return dest
+
+def _group_name(run, dest):
+    # Sessions are grouped by name - sessions named for their run dir
+    # are renamed with it.
+    if run.group_name == os.path.basename(run.run):
+        return os.path.basename(dest)
+    return run.group_name
+
+###################################################################
+# Merge runs
+###################################################################
+
+def merge_run(plan, output):
+    """Links or copies the files for a run into output.
+
+    Event files containing experiment summaries or renamed sessions are
+    rewritten - experiments are dropped in favor of the merged
+    experiment. All other files are linked where possible.
+
+    Returns a list of the method used for each file.
+    """
+    run = plan.src
+    dest_dir = os.path.join(output, plan.dest)
+    _ensure_dir(dest_dir)
+    methods = []
+    for name in run.files:
+        src = os.path.join(run.dir, name)
+        dest = os.path.join(dest_dir, name)
+        if _needs_rewrite(name, plan):
+            _rewrite_event_file(src, dest, plan.group_name)
+            methods.append("rewritten")
+        else:
+            methods.append(link_file(src, dest))
+    return methods
+
+def _needs_rewrite(name, plan):
+    run = plan.src
+    return (
+        name in run.experiment_files or
+        (name in run.session_files and plan.group_name != run.group_name))
+
+def _ensure_dir(dir):
+    try:
+        os.makedirs(dir)
+    except OSError:
+        if not os.path.isdir(dir):
+            raise
+
+def _rewrite_event_file(src, dest, group_name):
+    writer = RecordWriter(open(dest, "wb"))
+    try:
+        for record in _read_records(src):
+            record = _rewrite_record(record, group_name)
+            if record is not None:
+                writer.write(record)
+    finally:
+        writer.close()
+
+def _rewrite_record(record, group_name):
+    event = event_pb2.Event.FromString(record)
+    if not _has_hparams_values(event):
+        return record
+    values = []
+    for val in event.summary.value:
+        if val.tag == metadata.EXPERIMENT_TAG:
+            continue
+        if val.tag == metadata.SESSION_START_INFO_TAG:
+            _rename_session(val, group_name)
+        values.append(val)
+    if not values:
+        return None
+    del event.summary.value[:]
+    event.summary.value.extend(values)
+    return event.SerializeToString()
+
+def _has_hparams_values(event):
+    for val in event.summary.value:
+        if val.tag in (
+                metadata.EXPERIMENT_TAG, metadata.SESSION_START_INFO_TAG):
+            return True
+    return False
+
+def _rename_session(val, group_name):
+    data = plugin_data_pb2.HParamsPluginData.FromString(
+        val.metadata.plugin_data.content)
+    if data.session_start_info.group_name == group_name:
+        return
+    data.session_start_info.group_name = group_name
+    val.metadata.plugin_data.content = data.SerializeToString()
+
+def link_file(src, dest):
+    """Hardlinks, reflinks or copies src to dest.
+
+    Returns the method used: 'linked', 'reflinked' or 'copied'.
+    """
+    try:
+        os.link(src, dest)
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+            raise
+    else:
+        return "linked"
+    if _reflink(src, dest):
+        return "reflinked"
+    shutil.copyfile(src, dest)
+    return "copied"
+
+def _reflink(src, dest):
+    with open(src, "rb") as src_f:
+        with open(dest, "wb") as dest_f:
+            try:
+                fcntl.ioctl(dest_f.fileno(), FICLONE, src_f.fileno())
+            except (IOError, OSError):
+                reflinked = False
+            else:
+                reflinked = True
+    if not reflinked:
+        os.remove(dest)
+    return reflinked
+
+###################################################################
+# Merged experiment
+###################################################################
+
+class _HParamDomain(object):
+    """Union of the domains and values seen for an hparam.
+
+    Numbers widen an interval domain. Any string or bool value makes
+    the domain discrete over all values seen.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.display_name = ""
+        self.description = ""
+        self.type = api_pb2.DATA_TYPE_UNSET
+        self.min = None
+        self.max = None
+        self.values = []
+        self._seen = set()
+
+    def add_info(self, info):
+        self.display_name = self.display_name or info.display_name
+        self.description = self.description or info.description
+        self._add_type(info.type)
+        domain = info.WhichOneof("domain")
+        if domain == "domain_interval":
+            self._add(info.domain_interval.min_value)
+            self._add(info.domain_interval.max_value)
+        elif domain == "domain_discrete":
+            for val in info.domain_discrete.values:
+                self.add_value(val)
+
+    def _add_type(self, type):
+        if type == api_pb2.DATA_TYPE_UNSET or type == self.type:
+            return
+        if self.type == api_pb2.DATA_TYPE_UNSET:
+            self.type = type
+        else:
+            self.type = api_pb2.DATA_TYPE_STRING
+
+    def add_value(self, val):
+        kind = val.WhichOneof("kind")
+        if kind in ("number_value", "string_value", "bool_value"):
+            self._add(getattr(val, kind))
+
+    def _add(self, x):
+        if _is_number(x):
+            self.min = x if self.min is None else min(self.min, x)
+            self.max = x if self.max is None else max(self.max, x)
+        # Key on type as True == 1.0 and False == 0.0
+        key = (type(x), x)
+        if key not in self._seen:
+            self._seen.add(key)
+            self.values.append(x)
+
+    def HParamInfo(self):
+        info = api_pb2.HParamInfo(
+            name=self.name,
+            display_name=self.display_name,
+            description=self.description,
+            type=self.type)
+        if all(_is_number(x) for x in self.values):
+            if self.min is not None:
+                info.domain_interval.min_value = self.min
+                info.domain_interval.max_value = self.max
+            if info.type == api_pb2.DATA_TYPE_UNSET:
+                info.type = api_pb2.DATA_TYPE_FLOAT64
+        else:
+            info.domain_discrete.extend(self.values)
+        return info
+
+def _is_number(x):
+    return isinstance(x, (int, float)) and not isinstance(x, bool)
+
+def merged_experiment(scans):
+    """Returns the union of worker experiments and session hparams."""
+    domains = {}
+    metrics = {}
+    time_created = None
+    for scan in scans:
+        for exp in scan.experiments:
+            for info in exp.hparam_infos:
+                _domain(domains, info.name).add_info(info)
+            for info in exp.metric_infos:
+                key = (info.name.group, info.name.tag)
+                metrics.setdefault(key, info)
+            if exp.time_created_secs:
+                time_created = min(
+                    time_created or exp.time_created_secs,
+                    exp.time_created_secs)
+        for run in scan.runs:
+            for name, val in run.hparams.items():
+                _domain(domains, name).add_value(val)
+    return api_pb2.Experiment(
+        hparam_infos=[
+            domains[name].HParamInfo() for name in sorted(domains)],
+        metric_infos=[metrics[key] for key in sorted(metrics)],
+        time_created_secs=time_created or 0.0)
+
+def _domain(domains, name):
+    try:
+        return domains[name]
+    except KeyError:
+        domain = domains[name] = _HParamDomain(name)
+        return domain
+
+def write_experiment(experiment, logdir):
+    _ensure_dir(logdir)
+    writer = SummaryWriter(logdir)
+    writer.add_summary(hp._summary_pb(
+        metadata.EXPERIMENT_TAG,
+        plugin_data_pb2.HParamsPluginData(experiment=experiment)))
+    writer.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,15 @@
+import sys
+
 import tensorflow as tf
 from tensorboard.plugins.hparams import api as hp
 
+import trial_cache
+
 fashion_mnist = tf.keras.datasets.fashion_mnist
 
 (x_train, y_train),(x_test, y_test) = fashion_mnist.load_data()
 x_train, x_test = x_train / 255.0, x_test / 255.0
+DATA_DIGEST = trial_cache.data_digest(x_train, y_train, x_test, y_test)
 
 HP_NUM_UNITS = hp.HParam('num_units', hp.Discrete([16, 32]))
 HP_DROPOUT = hp.HParam('dropout', hp.RealInterval(0.1, 0.2))
@@ -35,12 +40,32 @@ def train_test_model(hparams):
     _, accuracy = model.evaluate(x_test, y_test)
     return accuracy
 
+# Digest the whole script - preprocessing and other module level code
+# feed training as much as train_test_model does.
+CODE_DIGEST = trial_cache.code_digest(sys.modules[__name__])
+
+TRIAL_CACHE = trial_cache.TrialCache()
+
 def run(run_dir, hparams):
     with tf.summary.create_file_writer(run_dir).as_default():
         hp.hparams(hparams)  # record the values used in this trial
-        accuracy = train_test_model(hparams)
+        accuracy = cached_train_test_model(hparams)
         tf.summary.scalar(METRIC_ACCURACY, accuracy, step=1)
 
+def cached_train_test_model(hparams):
+    hparam_vals = {h.name: hparams[h] for h in hparams}
+    key = trial_cache.trial_key(hparam_vals, CODE_DIGEST, DATA_DIGEST)
+    cached = TRIAL_CACHE.get(key)
+    if cached:
+        print('Using cached result for trial %s' % key[:8])
+        return cached[METRIC_ACCURACY]
+    accuracy = float(train_test_model(hparams))
+    TRIAL_CACHE.put(key, {
+        "hparams": trial_cache.normalize_hparams(hparam_vals),
+        METRIC_ACCURACY: accuracy,
+    })
+    return accuracy
+
 session_num = 0
 
 for num_units in HP_NUM_UNITS.domain.values:
@@ -0,0 +1,189 @@
+from __future__ import division
+
+import io
+import numbers
+import os
+
+import pytest
+
+pytest.importorskip("tensorboard")
+
+from tensorboard.backend.event_processing.event_file_loader import \
+    EventFileLoader
+from tensorboard.compat.proto import event_pb2
+from tensorboard.compat.proto import summary_pb2
+from tensorboard.plugins.hparams import metadata
+from tensorboard.plugins.hparams import plugin_data_pb2
+from tensorboard.plugins.hparams import summary_v2 as hp
+from tensorboard.summary.writer.record_writer import RecordWriter
+
+import hparams_wire
+import index2
+
+HPARAMS = [
+    {},
+    {"x": 1.0, "y": 0, "z": "cat"},
+    {"w": "cow", "x": 1.3},
+    {"t": True, "f": False, "zero": 0.0, "neg_zero": -0.0},
+    {"neg": -12345.678, "big": 1 << 60, "small": 1e-300},
+    {"": 1.0},
+    {"empty": "", u"ünicode": u"☃", "long": "x" * 300},
+    {"p%03i" % i: i / 7 for i in range(50)},
+]
+
+START_ARGS = [
+    ("", None, ""),
+    ("aaaa", 1565000000.123, ""),
+    (u"résumé noisy", 0.0, "not sure what this is"),
+    ("g" * 200, -1.5, "model"),
+]
+
+END_ARGS = [
+    (status, end_time)
+    for status in (0, 1, 2, 3)
+    for end_time in (None, 0.0, 1565000000.5)
+]
+
+EVENT_ARGS = [
+    (None, 0),
+    (1565000000.25, 1),
+    (0.0, -1),
+    (1.0, 1 << 40),
+]
+
+def _pb_bytes(msg):
+    return msg.SerializeToString(deterministic=True)
+
+def _pb_session_start_summary(group, hparams, start_time, model_uri,
+                              null_tensor):
+    info = plugin_data_pb2.SessionStartInfo(
+        group_name=group,
+        start_time_secs=start_time,
+        model_uri=model_uri)
+    for name, val in hparams.items():
+        if isinstance(val, bool):
+            info.hparams[name].bool_value = val
+        elif isinstance(val, numbers.Real):
+            info.hparams[name].number_value = val
+        else:
+            info.hparams[name].string_value = val
+    return _pb_summary(
+        metadata.SESSION_START_INFO_TAG,
+        plugin_data_pb2.HParamsPluginData(session_start_info=info),
+        null_tensor)
+
+def _pb_session_end_summary(status, end_time, null_tensor):
+    info = plugin_data_pb2.SessionEndInfo(
+        status=status,
+        end_time_secs=end_time)
+    return _pb_summary(
+        metadata.SESSION_END_INFO_TAG,
+        plugin_data_pb2.HParamsPluginData(session_end_info=info),
+        null_tensor)
+
+def _pb_summary(tag, data, null_tensor):
+    plugin_data = summary_pb2.SummaryMetadata.PluginData(
+        plugin_name=metadata.PLUGIN_NAME,
+        content=_pb_bytes(data))
+    value = summary_pb2.Summary.Value(
+        tag=tag,
+        metadata=summary_pb2.SummaryMetadata(plugin_data=plugin_data))
+    if null_tensor:
+        value.tensor.CopyFrom(metadata.NULL_TENSOR)
+    return summary_pb2.Summary(value=[value])
+
+@pytest.mark.parametrize("null_tensor", [False, True])
+@pytest.mark.parametrize("hparams", HPARAMS)
+@pytest.mark.parametrize("group,start_time,model_uri", START_ARGS)
+def test_session_start_summary(null_tensor, hparams, group, start_time,
+                               model_uri):
+    enc = hparams_wire.SessionEncoder(null_tensor=null_tensor)
+    got = enc.session_start_summary(group, hparams, start_time, model_uri)
+    expected = _pb_session_start_summary(
+        group, hparams, start_time, model_uri, null_tensor)
+    assert bytes(got) == _pb_bytes(expected)
+
+@pytest.mark.parametrize("null_tensor", [False, True])
+@pytest.mark.parametrize("status,end_time", END_ARGS)
+def test_session_end_summary(null_tensor, status, end_time):
+    enc = hparams_wire.SessionEncoder(null_tensor=null_tensor)
+    got = enc.session_end_summary(status, end_time)
+    expected = _pb_session_end_summary(status, end_time, null_tensor)
+    assert bytes(got) == _pb_bytes(expected)
+
+@pytest.mark.parametrize("wall_time,step", EVENT_ARGS)
+def test_event(wall_time, step):
+    enc = hparams_wire.SessionEncoder()
+    summary = bytes(enc.session_end_summary(1, 1565000000.5))
+    got = enc.event(summary, wall_time, step)
+    expected = event_pb2.Event(
+        summary=summary_pb2.Summary.FromString(summary),
+        wall_time=wall_time,
+        step=step)
+    assert bytes(got) == _pb_bytes(expected)
+
+def test_file_version_event():
+    got = hparams_wire.SessionEncoder().file_version_event(1565000000.5)
+    expected = event_pb2.Event(
+        wall_time=1565000000.5, file_version="brain.Event:2")
+    assert bytes(got) == _pb_bytes(expected)
+
+@pytest.mark.parametrize("run_id,hparams,_metrics", index2.RUNS)
+def test_index2_legacy_session(run_id, hparams, _metrics):
+    expected = index2.LegacySession(run_id, hparams)
+    start_time = _start_info(expected).start_time_secs
+    enc = hparams_wire.SessionEncoder(null_tensor=True)
+    got = enc.session_start_summary(run_id, hparams, start_time)
+    assert bytes(got) == _pb_bytes(_deterministic_content(expected))
+
+@pytest.mark.parametrize("run_id,hparams,_metrics", index2.RUNS)
+def test_hparams_api_session(run_id, hparams, _metrics):
+    expected = hp.hparams_pb(
+        hparams, trial_id=run_id, start_time_secs=1565000000.0)
+    group = _start_info(expected).group_name
+    enc = hparams_wire.SessionEncoder(null_tensor=True)
+    got = enc.session_start_summary(group, hparams, 1565000000.0)
+    assert bytes(got) == _pb_bytes(_deterministic_content(expected))
+
+def _deterministic_content(summary):
+    # Plugin data content is serialized without sorting the hparams
+    # map - re-serialize it so map entries are in key order.
+    plugin_data = summary.value[0].metadata.plugin_data
+    plugin_data.content = _pb_bytes(
+        plugin_data_pb2.HParamsPluginData.FromString(plugin_data.content))
+    return summary
+
+def _start_info(summary):
+    return metadata.parse_session_start_info_plugin_data(
+        summary.value[0].metadata.plugin_data.content)
+
+@pytest.mark.parametrize("data", [b"", b"x", b"\x00" * 1000])
+def test_write_record(data):
+    got = io.BytesIO()
+    hparams_wire.write_record(got, data)
+    expected = io.BytesIO()
+    RecordWriter(expected).write(data)
+    assert got.getvalue() == expected.getvalue()
+
+def test_event_file_writer(tmpdir):
+    enc = hparams_wire.SessionEncoder(null_tensor=True)
+    with hparams_wire.EventFileWriter(str(tmpdir)) as writer:
+        for i, (run_id, hparams, _metrics) in enumerate(index2.RUNS):
+            summary = bytes(enc.session_start_summary(run_id, hparams))
+            writer.write_event(enc.event(summary, 1565000000.0, i))
+    events = list(EventFileLoader(writer.path).Load())
+    assert events[0].file_version == "brain.Event:2"
+    groups = [_start_info(event.summary).group_name for event in events[1:]]
+    assert groups == [run_id for run_id, _, _ in index2.RUNS]
+    assert os.path.dirname(writer.path) == str(tmpdir)
+
+def test_event_file_writer_unique_paths(tmpdir):
+    enc = hparams_wire.SessionEncoder()
+    summary = bytes(enc.session_end_summary(1, 1565000000.5))
+    writers = [hparams_wire.EventFileWriter(str(tmpdir)) for _ in range(3)]
+    for writer in writers:
+        writer.write_event(enc.event(summary, 1565000000.0))
+        writer.close()
+    assert len(set(writer.path for writer in writers)) == 3
+    for writer in writers:
+        assert len(list(EventFileLoader(writer.path).Load())) == 2
@@ -0,0 +1,133 @@
+import hashlib
+import inspect
+import json
+import os
+
+import numpy as np
+
+DEFAULT_DIR = os.path.join(
+    os.getenv("HPARAMS_DEMO_CACHE_DIR") or
+    os.path.join(os.path.expanduser("~"), ".cache", "hparams-demo"),
+    "trials")
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+class TrialCache(object):
+    """Disk cache of trial results keyed by content hash.
+
+    Entries are JSON files named by key. Reading an entry updates its
+    mtime so that when the cache grows past `max_bytes` the least
+    recently used entries are removed first.
+    """
+
+    def __init__(self, path=DEFAULT_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def get(self, key):
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path) as f:
+                record = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        _touch(entry_path)
+        return record
+
+    def put(self, key, record):
+        _ensure_dir(self.path)
+        entry_path = self._entry_path(key)
+        tmp = "%s.%i.tmp" % (entry_path, os.getpid())
+        with open(tmp, "w") as f:
+            json.dump(record, f, sort_keys=True)
+        os.rename(tmp, entry_path)
+        self.evict()
+
+    def evict(self):
+        entries = self._entries()
+        total = sum(size for _mtime, size, _path in entries)
+        for _mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, key + ".json")
+
+    def _entries(self):
+        entries = []
+        try:
+            names = os.listdir(self.path)
+        except OSError:
+            return entries
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.path, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+def _touch(path):
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+def _ensure_dir(path):
+    try:
+        os.makedirs(path)
+    except OSError:
+        if not os.path.isdir(path):
+            raise
+
+def trial_key(hparams, code_digest, data_digest):
+    """Returns a cache key for a trial.
+
+    `hparams` is a dict of hparam names to values. `code_digest` and
+    `data_digest` identify the training code and dataset (see
+    `code_digest` and `data_digest`).
+    """
+    key = {
+        "hparams": normalize_hparams(hparams),
+        "code": code_digest,
+        "data": data_digest,
+    }
+    encoded = json.dumps(key, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+def normalize_hparams(hparams):
+    return {
+        str(name): _normalize_hparam_val(val)
+        for name, val in hparams.items()
+    }
+
+def _normalize_hparam_val(val):
+    if isinstance(val, bool) or val is None:
+        return val
+    if isinstance(val, (int, float)):
+        return float(val)
+    return str(val)
+
+def code_digest(*objs):
+    """Returns a digest of the source code for objs."""
+    h = hashlib.sha256()
+    for obj in objs:
+        h.update(inspect.getsource(obj).encode("utf-8"))
+    return h.hexdigest()
+
+def data_digest(*arrays):
+    """Returns a digest of the shape, type and contents of arrays."""
+    h = hashlib.sha256()
+    for arr in arrays:
+        h.update(("%s %s" % (arr.dtype.str, arr.shape)).encode("utf-8"))
+        # Hash the array buffer in place - tobytes() copies it
+        h.update(memoryview(np.ascontiguousarray(arr)))
+    return h.hexdigest()
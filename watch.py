@@ -0,0 +1,317 @@
+from __future__ import print_function
+
+import argparse
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import time
+
+from google.protobuf.message import DecodeError
+
+from tensorboard.compat.proto import event_pb2
+from tensorboard.compat.proto import summary_pb2
+
+from eventfiles import EventFileTail
+from eventfiles import is_event_file
+
+log = logging.getLogger("watch")
+
+SCALARS_PLUGIN_NAME = "scalars"
+
+# inotify(7) flags
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+class RunState(object):
+
+    def __init__(self, run):
+        self.run = run
+        self.tags = set()
+        self.first_scalar = None
+
+class LogdirWatcher(object):
+    """Tracks scalar tags for runs in a logdir as events are written.
+
+    Uses inotify to learn which event files changed, falling back to
+    polling file sizes where inotify isn't available or runs out of
+    watches. Only bytes appended since the last read are parsed.
+
+    `on_first_scalar(run, tag)` is called once per run when its first
+    top-level scalar (a tag without '/') is seen. `on_new_tag(run,
+    tag)` is called for each scalar tag the first time it's seen for a
+    run. Runs are named by their path relative to logdir ('' for the
+    logdir itself).
+    """
+
+    def __init__(self, logdir, on_first_scalar=None, on_new_tag=None,
+                 poll_interval=1.0, use_inotify=True):
+        self.logdir = logdir
+        self.on_first_scalar = on_first_scalar
+        self.on_new_tag = on_new_tag
+        self.poll_interval = poll_interval
+        self.runs = {}
+        self._tails = {}
+        self._inotify = _Inotify.create() if use_inotify else None
+        self._scan_dir(logdir)
+
+    @property
+    def using_inotify(self):
+        return self._inotify is not None
+
+    def run(self):
+        while True:
+            self.poll()
+
+    def poll(self, timeout=None):
+        if timeout is None:
+            timeout = self.poll_interval
+        if self._inotify:
+            self._poll_inotify(timeout)
+        else:
+            time.sleep(timeout)
+            self._poll_stat()
+
+    def close(self):
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+
+    def _scan_dir(self, dir):
+        for root, _dirs, files in os.walk(dir):
+            if self._inotify:
+                self._add_watch(root)
+            for name in files:
+                self._file_changed(os.path.join(root, name))
+
+    def _add_watch(self, dir):
+        try:
+            self._inotify.add_watch(dir)
+        except OSError as e:
+            if e.errno != errno.ENOSPC:
+                raise
+            # Out of watches (fs.inotify.max_user_watches) - files in
+            # unwatched dirs would be missed, so poll everything
+            log.warning(
+                "Cannot watch %s (%s) - polling %s instead",
+                dir, e.strerror, self.logdir)
+            self.close()
+
+    def _poll_inotify(self, timeout):
+        for path, mask in self._inotify.read_events(timeout):
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped, including any for new run dirs
+                log.warning(
+                    "inotify queue overflow - rescanning %s", self.logdir)
+                self._scan_dir(self.logdir)
+            elif mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._scan_dir(path)
+            else:
+                self._file_changed(path)
+
+    def _poll_stat(self):
+        for root, _dirs, files in os.walk(self.logdir):
+            for name in files:
+                if not is_event_file(name):
+                    continue
+                path = os.path.join(root, name)
+                tail = self._tails.get(path)
+                if tail is None or _file_size(path) != tail.offset:
+                    self._file_changed(path)
+
+    def _file_changed(self, path):
+        if not is_event_file(os.path.basename(path)):
+            return
+        tail = self._tails.get(path)
+        if tail is None:
+            tail = self._tails[path] = EventFileTail(path)
+        records = tail.read_records()
+        if records:
+            state = self._run_state(os.path.dirname(path))
+            for record in records:
+                self._handle_record(record, state)
+
+    def _run_state(self, dir):
+        run = os.path.relpath(dir, self.logdir)
+        if run == ".":
+            run = ""
+        try:
+            return self.runs[run]
+        except KeyError:
+            state = self.runs[run] = RunState(run)
+            return state
+
+    def _handle_record(self, record, state):
+        try:
+            event = event_pb2.Event.FromString(record)
+        except DecodeError as e:
+            log.warning(
+                "Skipping corrupt event record in run '%s': %s",
+                state.run, e)
+            return
+        for val in event.summary.value:
+            if val.tag in state.tags or not _is_scalar(val):
+                continue
+            state.tags.add(val.tag)
+            if self.on_new_tag:
+                self.on_new_tag(state.run, val.tag)
+            if state.first_scalar is None and "/" not in val.tag:
+                state.first_scalar = val.tag
+                if self.on_first_scalar:
+                    self.on_first_scalar(state.run, val.tag)
+
+def _is_scalar(val):
+    if val.WhichOneof("value") == "simple_value":
+        return True
+    return (
+        val.metadata.plugin_data.plugin_name == SCALARS_PLUGIN_NAME or
+        val.metadata.data_class == summary_pb2.DATA_CLASS_SCALAR)
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+###################################################################
+# inotify
+###################################################################
+
+class _Inotify(object):
+
+    @classmethod
+    def create(cls):
+        libc = _libc()
+        if not libc:
+            return None
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return None
+        return cls(libc, fd)
+
+    def __init__(self, libc, fd):
+        self._libc = libc
+        self._fd = fd
+        self._dirs = {}
+
+    def add_watch(self, dir):
+        wd = self._libc.inotify_add_watch(
+            self._fd, _fsencode(dir), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err not in (errno.ENOENT, errno.ENOTDIR):
+                raise OSError(err, os.strerror(err), dir)
+            return
+        self._dirs[wd] = dir
+
+    def read_events(self, timeout):
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self._fd, 65536)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return []
+            raise
+        return self._parse_events(data)
+
+    def _parse_events(self, data):
+        events = []
+        pos = 0
+        while pos < len(data):
+            wd, mask, _cookie, name_len = _INOTIFY_EVENT.unpack_from(
+                data, pos)
+            pos += _INOTIFY_EVENT.size
+            name = data[pos:pos + name_len].rstrip(b"\0")
+            pos += name_len
+            if mask & IN_Q_OVERFLOW:
+                events.append((None, mask))
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            dir = self._dirs.get(wd)
+            if dir is None or not name:
+                continue
+            events.append((os.path.join(dir, _fsdecode(name)), mask))
+        return events
+
+    def close(self):
+        os.close(self._fd)
+
+def _libc():
+    try:
+        libc = ctypes.CDLL(
+            ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+def _fsencode(path):
+    if isinstance(path, bytes):
+        return path
+    return path.encode("utf-8")
+
+def _fsdecode(name):
+    return name.decode("utf-8", "replace")
+
+###################################################################
+# Main
+###################################################################
+
+def main():
+    args = _init_args()
+    watcher = LogdirWatcher(
+        args.logdir,
+        on_first_scalar=_print_first_scalar,
+        on_new_tag=_print_new_tag,
+        poll_interval=args.interval,
+        use_inotify=not args.poll)
+    print(
+        "Watching %s (%s)"
+        % (args.logdir, "inotify" if watcher.using_inotify else "polling"))
+    try:
+        watcher.run()
+    finally:
+        watcher.close()
+
+def _init_args():
+    p = argparse.ArgumentParser()
+    p.add_argument("logdir")
+    p.add_argument(
+        "--poll", action="store_true",
+        help="poll file sizes rather than use inotify")
+    p.add_argument(
+        "--interval", type=float, default=1.0,
+        help="poll interval in seconds (default is 1.0)")
+    return p.parse_args()
+
+def _print_first_scalar(run, tag):
+    print("%s: first scalar '%s' - ready for experiment" % (run or ".", tag))
+
+def _print_new_tag(run, tag):
+    print("%s: new scalar '%s'" % (run or ".", tag))
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("")